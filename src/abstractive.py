@@ -1,22 +1,29 @@
 import os
 import sys
+import glob
+import json
+import hashlib
 import logging
+import multiprocessing
 import random
 import torch
 import datasets as nlp
 import pyarrow
 import itertools
 import spacy
-import numpy as np
 from spacy.lang.en import English
 from functools import partial
+from concurrent.futures import ProcessPoolExecutor
 from time import time
 from collections import OrderedDict
-from argparse import ArgumentParser
+from argparse import ArgumentParser, Namespace
 from torch import nn
-from rouge_score import rouge_scorer, scoring
+from torch.nn.utils.rnn import pad_sequence
+from rouge_score import scoring
 from torch.utils.data import DataLoader
 import pytorch_lightning as pl
+import transformers
+from packaging import version
 from transformers import (
     AutoTokenizer,
     EncoderDecoderModel,
@@ -24,9 +31,11 @@ from transformers import (
     AutoModelForSeq2SeqLM,
 )
 from helpers import (
-    pad,
     LabelSmoothingLoss,
     SortishSampler,
+    BucketBatchSampler,
+    DataPreFetcher,
+    CachingRougeScorer,
     pad_tensors,
     test_rouge,
     generic_configure_optimizers,
@@ -46,13 +55,45 @@ except ImportError:
 def trim_batch(
     input_ids, pad_token_id, attention_mask=None,
 ):
-    """Remove columns that are populated exclusively by ``pad_token_id``."""
-    keep_column_mask = input_ids.ne(pad_token_id).any(dim=0)
+    """
+    Remove columns that are populated exclusively by ``pad_token_id``. Assumes that the
+    sequences are right-padded so the batch can be sliced to the length of the longest
+    sequence, which returns a view instead of copying the kept columns.
+    """
+    max_length = int(input_ids.ne(pad_token_id).sum(dim=1).max())
 
     if attention_mask is None:
-        return input_ids[:, keep_column_mask]
+        return input_ids[:, :max_length]
+
+    return (input_ids[:, :max_length], attention_mask[:, :max_length])
+
+
+def tokenized_split_files(path):
+    """
+    Return the files that contain the tokenized split saved at ``path``. When a split is
+    tokenized with more than one process, ``map()`` writes one file per process by adding
+    ``_<rank>_of_<num_proc>`` before the extension of ``path``.
+    """
+    if os.path.isfile(path):
+        return [path]
+    base_name, extension = os.path.splitext(path)
+    return sorted(glob.glob(glob.escape(base_name) + "_*_of_*" + extension))
+
+
+# The ROUGE scorer used by each process of `AbstractiveSummarizer.rouge_pool`
+_rouge_worker_scorer = None
 
-    return (input_ids[:, keep_column_mask], attention_mask[:, keep_column_mask])
+
+def _init_rouge_worker(rouge_metrics):
+    global _rouge_worker_scorer  # skipcq: PYL-W0603
+    _rouge_worker_scorer = CachingRougeScorer(rouge_metrics, use_stemmer=True)
+
+
+def _score_rouge(targets, predictions):
+    return [
+        _rouge_worker_scorer.score(target, prediction)
+        for target, prediction in zip(targets, predictions)
+    ]
 
 
 def longformer_modifier(final_dictionary, tokenizer, attention_window):
@@ -98,8 +139,27 @@ class AbstractiveSummarizer(pl.LightningModule):
     def __init__(self, hparams):
         super(AbstractiveSummarizer, self).__init__()
 
+        if type(hparams) is not Namespace:
+            hparams = Namespace(**hparams)
+
+        # Set new parameters to defaults if they do not exist in the `hparams` Namespace
+        # so models saved before these options were added can still be loaded
+        hparams.amp_backend = getattr(hparams, "amp_backend", "native")
+        hparams.preprocessing_num_workers = getattr(
+            hparams, "preprocessing_num_workers", None
+        )
+        hparams.bucket_sampler = getattr(hparams, "bucket_sampler", False)
+        hparams.prefetch_to_gpu = getattr(hparams, "prefetch_to_gpu", False)
+        hparams.compile_model = getattr(hparams, "compile_model", False)
+        hparams.attn_implementation = getattr(hparams, "attn_implementation", None)
+        hparams.gen_length_penalty = getattr(hparams, "gen_length_penalty", None)
+
         self.hparams = hparams
 
+        assert not (
+            self.hparams.sortish_sampler and self.hparams.bucket_sampler
+        ), "The `--sortish_sampler` and `--bucket_sampler` options cannot be used together."
+
         if len(self.hparams.dataset) <= 1:
             self.hparams.dataset = self.hparams.dataset[0]
 
@@ -112,22 +172,50 @@ class AbstractiveSummarizer(pl.LightningModule):
                 self.hparams.model_name_or_path, add_prefix_space=True
             )
         else:
-            if self.hparams.decoder_model_name_or_path:
-                self.model = EncoderDecoderModel.from_encoder_decoder_pretrained(
-                    self.hparams.model_name_or_path,
-                    (
-                        self.hparams.decoder_model_name_or_path
-                        if self.hparams.decoder_model_name_or_path
-                        else self.hparams.model_name_or_path
-                    ),
-                    gradient_checkpointing=self.hparams.gradient_checkpointing,
-                    tie_encoder_decoder=self.hparams.tie_encoder_decoder,
-                )
-            else:
-                self.model = AutoModelForSeq2SeqLM.from_pretrained(
-                    self.hparams.model_name_or_path,
-                    gradient_checkpointing=self.hparams.gradient_checkpointing,
+            # Select the attention implementation (for example, `sdpa` for the fused
+            # `scaled_dot_product_attention` kernels), which requires transformers 4.36+
+            attn_kwargs = {}
+            if self.hparams.attn_implementation:
+                if version.parse(transformers.__version__) >= version.parse("4.36.0"):
+                    attn_kwargs = {
+                        "attn_implementation": self.hparams.attn_implementation
+                    }
+                else:
+                    logger.warning(
+                        "`--attn_implementation` requires huggingface/transformers version 4.36.0 or newer, but you have version %s installed. The default attention implementation will be used.",
+                        transformers.__version__,
+                    )
+
+            try:
+                self.model = self.load_seq2seq_model(attn_kwargs)
+            except (ValueError, ImportError) as error:
+                # Not every model supports every attention implementation (for example,
+                # BERT does not support `flash_attention_2`) and `flash_attention_2`
+                # requires the `flash_attn` package.
+                if not attn_kwargs:
+                    raise
+                logger.warning(
+                    "Could not load the model with `--attn_implementation %s` (%s). The default attention implementation will be used.",
+                    self.hparams.attn_implementation,
+                    error,
                 )
+                self.model = self.load_seq2seq_model()
+
+            # Enable gradient checkpointing for both the encoder and the decoder. Newer
+            # versions of huggingface/transformers ignore the `gradient_checkpointing`
+            # argument passed by `load_seq2seq_model()` and provide
+            # `gradient_checkpointing_enable()` instead. Older versions drop the
+            # argument in `from_encoder_decoder_pretrained()` because it is not
+            # prefixed with `encoder_` or `decoder_`, so the flag is set on the
+            # configurations, which the BERT encoder reads during the forward pass.
+            # The cache is not used during training since `forward()` sets `use_cache`
+            # to False when `labels` are given.
+            if self.hparams.gradient_checkpointing:
+                if hasattr(self.model, "gradient_checkpointing_enable"):
+                    self.model.gradient_checkpointing_enable()
+                elif isinstance(self.model, EncoderDecoderModel):
+                    self.model.encoder.config.gradient_checkpointing = True
+                    self.model.decoder.config.gradient_checkpointing = True
 
             self.tokenizer = AutoTokenizer.from_pretrained(
                 self.hparams.model_name_or_path, use_fast=True
@@ -176,26 +264,61 @@ class AbstractiveSummarizer(pl.LightningModule):
             }
             self.tokenizer.add_special_tokens(special_tokens_dict)
 
+        # Store the special token IDs that are used for every batch so they do not need
+        # to be looked up on the tokenizer each time.
+        self.pad_token_id = self.tokenizer.pad_token_id
+        self.sep_token_id = self.tokenizer.sep_token_id
+
         if self.hparams.label_smoothing > 0:
             self.loss_func = LabelSmoothingLoss(
                 self.hparams.label_smoothing,
                 self.tokenizer.vocab_size,
-                ignore_index=self.tokenizer.pad_token_id,
+                ignore_index=self.pad_token_id,
             )
         else:
-            self.loss_func = nn.CrossEntropyLoss(
-                ignore_index=self.tokenizer.pad_token_id
-            )
+            self.loss_func = nn.CrossEntropyLoss(ignore_index=self.pad_token_id)
+
+        # Only the forward function is compiled so `self.model` remains an ordinary
+        # module for `generate()`, which cannot be captured in a graph, and for saving.
+        # The batches are padded dynamically so the compiled graphs support dynamic shapes.
+        self.model_forward = self.model.forward
+        if self.hparams.compile_model:
+            if hasattr(torch, "compile"):
+                self.model_forward = torch.compile(self.model.forward, dynamic=True)
+            else:
+                logger.warning(
+                    "`--compile_model` requires PyTorch 2.0 or newer, but you have version %s installed. The model will not be compiled.",
+                    torch.__version__,
+                )
 
-        self.train_dataloader_object = None  # not created yet
         self.rouge_metrics = None
-        self.rouge_scorer = None
+        self.rouge_pool = None
+        self.rouge_futures = []
         self.dataset = {}
 
+        # The tokenized data depends on the tokenizer and the preprocessing options, so
+        # a hash of them is added to the file names. Changing any of them creates new
+        # files instead of loading data that was tokenized differently.
+        tokenized_data_options = [
+            self.hparams.dataset,
+            self.hparams.dataset_version,
+            self.hparams.data_example_column,
+            self.hparams.data_summarized_column,
+            self.hparams.model_name_or_path,
+            self.tokenizer.max_len,
+            self.hparams.split_char,
+            self.hparams.sentencizer,
+            self.hparams.use_percentage_of_data,
+        ]
+        self.tokenized_data_key = hashlib.sha1(
+            json.dumps(tokenized_data_options).encode("utf-8")
+        ).hexdigest()[:10]
+
         self.tokenized_data_file_paths = {}
         for split in ["train", "validation", "test"]:
             features_cache_file = os.path.join(
-                self.hparams.cache_file_path, (split + "_tokenized")
+                self.hparams.cache_file_path,
+                (split + "_tokenized_" + self.tokenized_data_key + ".arrow"),
             )
             self.tokenized_data_file_paths[split] = features_cache_file
 
@@ -211,6 +334,38 @@ class AbstractiveSummarizer(pl.LightningModule):
         else:
             self.collate_fn = self.abs_collate_fn
 
+    def load_seq2seq_model(self, model_kwargs=None):
+        """
+        Load the ``EncoderDecoderModel`` if ``--decoder_model_name_or_path`` is set or the
+        ``AutoModelForSeq2SeqLM`` otherwise. ``model_kwargs`` are passed to both the encoder
+        and the decoder of the ``EncoderDecoderModel``.
+        """
+        model_kwargs = model_kwargs or {}
+        if self.hparams.decoder_model_name_or_path:
+            # Arguments prefixed with `encoder_` and `decoder_` are passed to the
+            # encoder and decoder respectively.
+            encoder_decoder_kwargs = {}
+            for key, value in model_kwargs.items():
+                encoder_decoder_kwargs["encoder_" + key] = value
+                encoder_decoder_kwargs["decoder_" + key] = value
+            return EncoderDecoderModel.from_encoder_decoder_pretrained(
+                self.hparams.model_name_or_path,
+                (
+                    self.hparams.decoder_model_name_or_path
+                    if self.hparams.decoder_model_name_or_path
+                    else self.hparams.model_name_or_path
+                ),
+                gradient_checkpointing=self.hparams.gradient_checkpointing,
+                tie_encoder_decoder=self.hparams.tie_encoder_decoder,
+                **encoder_decoder_kwargs,
+            )
+
+        return AutoModelForSeq2SeqLM.from_pretrained(
+            self.hparams.model_name_or_path,
+            gradient_checkpointing=self.hparams.gradient_checkpointing,
+            **model_kwargs,
+        )
+
     def forward(
         self,
         source=None,
@@ -249,7 +404,7 @@ class AbstractiveSummarizer(pl.LightningModule):
         """
         # `self.model.forward()` returns `decoder_outputs + encoder_outputs` where
         # `decoder_outputs` and `encoder_outputs` are dictionaries.
-        outputs = self.model.forward(
+        outputs = self.model_forward(
             input_ids=source.contiguous(),
             attention_mask=source_mask,
             decoder_input_ids=target,
@@ -276,10 +431,22 @@ class AbstractiveSummarizer(pl.LightningModule):
         """
         columns = ["source", "target", "source_mask", "target_mask"]
         if stage == "fit":
-            train = nlp.Dataset.from_file(self.tokenized_data_file_paths["train"])
-            validation = nlp.Dataset.from_file(
-                self.tokenized_data_file_paths["validation"]
-            )
+            train = self.load_tokenized_split("train")
+            validation = self.load_tokenized_split("validation")
+
+            if self.hparams.bucket_sampler:
+                # Datasets tokenized before the `source_len` column was added only
+                # contain the attention masks, which can be used to find the lengths.
+                if "source_len" in train.column_names:
+                    self.train_source_lengths = train["source_len"]
+                else:
+                    self.train_source_lengths = [
+                        sum(mask) for mask in train["source_mask"]
+                    ]
+
+            # Stored so `configure_optimizers()` does not need to create the train
+            # dataloader to determine the number of training steps
+            self.num_train_batches = len(train) // self.hparams.batch_size
 
             train.set_format(type="torch", columns=columns)
             validation.set_format(type="torch", columns=columns)
@@ -287,17 +454,46 @@ class AbstractiveSummarizer(pl.LightningModule):
             self.dataset["validation"] = validation
 
         if stage == "test":
-            test = nlp.Dataset.from_file(self.tokenized_data_file_paths["test"])
+            test = self.load_tokenized_split("test")
             test.set_format(type="torch", columns=columns)
             self.dataset["test"] = test
 
+    def load_tokenized_split(self, split):
+        """
+        Load the tokenized ``split`` saved by :meth:`~abstractive.AbstractiveSummarizer.prepare_data`
+        as a single ``nlp.Dataset``. If it does not exist, a file named ``<split>_tokenized``
+        in ``--cache_file_path`` (such as the downloadable preprocessed data) is loaded
+        instead.
+        """
+        files = tokenized_split_files(self.tokenized_data_file_paths[split])
+        if not files:
+            fallback_path = os.path.join(
+                self.hparams.cache_file_path, (split + "_tokenized")
+            )
+            if not os.path.isfile(fallback_path):
+                raise FileNotFoundError(
+                    "Could not find the tokenized %s data at %s or %s"
+                    % (split, self.tokenized_data_file_paths[split], fallback_path)
+                )
+            logger.warning(
+                "Loading %s, which may have been tokenized with different options, because %s does not exist.",
+                fallback_path,
+                self.tokenized_data_file_paths[split],
+            )
+            files = [fallback_path]
+
+        if len(files) == 1:
+            return nlp.Dataset.from_file(files[0])
+        return nlp.concatenate_datasets([nlp.Dataset.from_file(x) for x in files])
+
     def prepare_data(self):
         """
         Create the data using the ``huggingface/nlp`` library. This function handles
         downloading, preprocessing, tokenization, and feature extraction.
         """
         all_tokenized_files_present = all(
-            os.path.isfile(path) for path in self.tokenized_data_file_paths.values()
+            tokenized_split_files(path)
+            for path in self.tokenized_data_file_paths.values()
         )
         if self.hparams.no_prepare_data or all_tokenized_files_present:
             logger.info(
@@ -310,58 +506,55 @@ class AbstractiveSummarizer(pl.LightningModule):
                 sys.exit(0)
             return
 
-        def convert_to_features(example_batch):
-            max_length = self.tokenizer.max_len
+        if self.hparams.dataset == "scientific_papers":
+            self.hparams.data_example_column = "article"
+            self.hparams.data_summarized_column = "abstract"
 
-            articles = example_batch[self.hparams.data_example_column]
+        # Copy the values needed during preprocessing to local variables so the
+        # functions passed to `map()` and `filter()` do not capture `self`. `nlp`
+        # hashes these functions to fingerprint the cache and pickles them to send to
+        # the worker processes, which is slow and unnecessary for the entire model.
+        tokenizer = self.tokenizer
+        data_example_column = self.hparams.data_example_column
+        data_summarized_column = self.hparams.data_summarized_column
+        split_char = self.hparams.split_char
+        use_percentage_of_data = self.hparams.use_percentage_of_data
+        target_boseq_token_id = self.target_boseq_token_id
+        target_eoseq_token_id = self.target_eoseq_token_id
 
-            articles_encoded_step = []
-            for idx, article in enumerate(articles):
-                article = article.strip()
-                try:
-                    article_encoded = self.tokenizer(
-                        article, padding="max_length", truncation=True,
-                    )
-                    articles_encoded_step.append(article_encoded)
-                except:  # skipcq: FLK-E722
-                    print("Failed to tokenize article: {}".format(article))
-                    sys.exit(1)
-
-                if idx != 0:
-                    current_length = len(article_encoded["input_ids"])
-                    first_length = len(articles_encoded_step[0]["input_ids"])
-                    assert (
-                        current_length == first_length
-                    ), "The length of the current input, {}, does not match the length of the first input, {}.".format(
-                        current_length, first_length
-                    )
+        def convert_to_features(example_batch):
+            max_length = tokenizer.max_len
 
-            articles_encoded = {
-                "input_ids": [i["input_ids"] for i in articles_encoded_step],
-                "attention_mask": [i["attention_mask"] for i in articles_encoded_step],
-            }
+            articles = [
+                article.strip() for article in example_batch[data_example_column]
+            ]
 
-            # articles_encoded = self.tokenizer.batch_encode_plus(
-            #     articles, pad_to_max_length=True, truncation=True,
-            # )
+            # The articles are not padded. They are padded to the length of the longest
+            # article in each batch by `abs_collate_fn()`.
+            articles_encoded = tokenizer(
+                articles,
+                truncation=True,
+                padding=False,
+                return_attention_mask=True,
+                return_token_type_ids=False,
+            )
 
-            highlights = example_batch[self.hparams.data_summarized_column]
+            highlights = example_batch[data_summarized_column]
 
             # Tokenize highlights using spacy to split them into sentences if they were not
             # already split in the dataset (use `hparams.split_char` to specify the sentence
             # boundary character)
-            if not self.hparams.split_char:
+            if not split_char:
                 highlights = tokenize(spacy_nlp, highlights, disable_progress_bar=True)
 
-            sep_token = self.tokenizer.sep_token
+            sep_token = tokenizer.sep_token
             highlights_input_ids = []
-            highlights_attention_masks = []
 
             # For each ground-truth summary
             for highlight in highlights:
-                if self.hparams.split_char:
+                if split_char:
                     # simply split into sentences if `hparams.split_char` is specified
-                    sents = highlight.split(self.hparams.split_char)
+                    sents = highlight.split(split_char)
                 else:
                     # `highlight` is a list of sentences where each sentence is a list of tokens
                     # Combine those tokens to create a list of sentences.
@@ -375,7 +568,7 @@ class AbstractiveSummarizer(pl.LightningModule):
                 for sent in sents:
                     assert type(sent) is str
                     assert len(sent) > 0
-                    sent = self.tokenizer.tokenize(sent)
+                    sent = tokenizer.tokenize(sent)
                     sent.append(sep_token)
                     sents_tokenized.append(sent)
 
@@ -393,7 +586,7 @@ class AbstractiveSummarizer(pl.LightningModule):
                 # Convert the tokens to `input_ids`
                 # `max_length` is the max length minus 2 because we need to add the
                 # beginning and ending tokens to the target
-                sents_input_ids = self.tokenizer.encode_plus(
+                sents_input_ids = tokenizer.encode_plus(
                     sents_tokenized_flat,
                     truncation=True,
                     is_pretokenized=True,
@@ -403,46 +596,38 @@ class AbstractiveSummarizer(pl.LightningModule):
                     return_token_type_ids=False,
                 )["input_ids"]
 
-                # Insert beginning of sequence token and append end of sequence token.
-                sents_input_ids.insert(0, self.target_boseq_token_id)
-                sents_input_ids.append(self.target_eoseq_token_id)
-
-                # Create attention mask
-                attention_mask = [1] * len(sents_input_ids)
-
-                # Append the `input_ids` and `attention_mask`
                 highlights_input_ids.append(sents_input_ids)
-                highlights_attention_masks.append(attention_mask)
 
-            # Pad the highlight input ids and attention masks to `tokenizer.max_len`.
-            # The articles have already been padded because they do not need the extra
-            # `boseq` and `eoseq` tokens.
-            highlights_input_ids = pad(
-                highlights_input_ids, self.tokenizer.pad_token_id, width=max_length,
-            )
-            highlights_attention_masks = pad(
-                highlights_attention_masks, 0, width=max_length
-            )
+            # Add the `boseq` and `eoseq` tokens to each highlight. Like the articles,
+            # the highlights are stored without padding. The attention masks are
+            # created from the lengths instead of by comparing against `pad_token_id`
+            # because the `eoseq` token may be the `pad_token`.
+            highlights_input_ids = [
+                [target_boseq_token_id] + sents_input_ids + [target_eoseq_token_id]
+                for sents_input_ids in highlights_input_ids
+            ]
+            highlights_attention_masks = [[1] * len(x) for x in highlights_input_ids]
 
             return {
                 "source": articles_encoded["input_ids"],
+                "source_len": [len(x) for x in articles_encoded["input_ids"]],
                 "target": highlights_input_ids,
                 "source_mask": articles_encoded["attention_mask"],
                 "target_mask": highlights_attention_masks,
             }
 
         def remove_empty(batch_item):
-            article = batch_item[self.hparams.data_example_column]
+            article = batch_item[data_example_column]
             article = article.strip()
-            highlight = batch_item[self.hparams.data_summarized_column]
+            highlight = batch_item[data_summarized_column]
             highlight = highlight.strip()
             # keep_article = article and article != "\n" and article != ""
             # keep_highlight = highlight and highlight != "\n" and highlight != ""
-            if self.hparams.use_percentage_of_data:
+            if use_percentage_of_data:
                 keep_example = (
                     article
                     and highlight
-                    and random.random() < self.hparams.use_percentage_of_data
+                    and random.random() < use_percentage_of_data
                 )
             else:
                 keep_example = bool(article and highlight)
@@ -463,9 +648,6 @@ class AbstractiveSummarizer(pl.LightningModule):
 
         # Combine the two sections of `scientific_papers` if it is chosen as the dataset
         if self.hparams.dataset == "scientific_papers":
-            self.hparams.data_example_column = "article"
-            self.hparams.data_summarized_column = "abstract"
-
             dataset_pubmed = nlp.load_dataset(
                 "scientific_papers", "pubmed", cache_dir=self.hparams.nlp_cache_dir
             )
@@ -486,7 +668,7 @@ class AbstractiveSummarizer(pl.LightningModule):
                 # and write to file. Don't process if the final tokenized version is
                 # present and can be loaded.
                 if (not os.path.exists(save_path)) and (
-                    not os.path.exists(save_path_final_tokenized)
+                    not tokenized_split_files(save_path_final_tokenized)
                 ):
                     logger.info("Joining split %s", split)
                     new = pyarrow.concat_tables(
@@ -500,7 +682,7 @@ class AbstractiveSummarizer(pl.LightningModule):
                         "Skipping joining split %s because it already exists", split
                     )
 
-                if not os.path.exists(save_path_final_tokenized):
+                if not tokenized_split_files(save_path_final_tokenized):
                     # Load combined dataset from file if the final tokenized version
                     # does not exist.
                     logger.info("Loading split %s", save_path)
@@ -529,29 +711,55 @@ class AbstractiveSummarizer(pl.LightningModule):
                     cache_dir=self.hparams.nlp_cache_dir,
                 )
 
+        num_proc = self.hparams.preprocessing_num_workers
+        if num_proc is None:
+            num_proc = min(os.cpu_count() or 1, 8)
+        # 0 means to tokenize in the main process like `--dataloader_num_workers`
+        num_proc = max(1, num_proc)
+        # The fast tokenizers are already multithreaded so disable their parallelism
+        # when tokenizing in multiple processes to avoid oversubscribing the CPU.
+        if num_proc > 1:
+            os.environ["TOKENIZERS_PARALLELISM"] = "false"
+
         for split, features_cache_file in self.tokenized_data_file_paths.items():
-            # If the tokenized version has not been created yet, then do the initial
-            # filtering so it can be created
-            if not os.path.isfile(features_cache_file):
-                logger.info("Removing empty examples from %s dataset", split)
-                start_num_examples = len(self.dataset[split])
-                self.dataset[split] = self.dataset[split].filter(
-                    remove_empty,
-                    cache_file_name=os.path.join(
-                        self.hparams.cache_file_path, (split + "_filtered")
-                    ),
-                )
-                end_num_examples = len(self.dataset[split])
+            # Skip splits that have already been tokenized
+            if tokenized_split_files(features_cache_file):
                 logger.info(
-                    "Removed %i (%.2f%%) examples from the dataset.",
-                    start_num_examples - end_num_examples,
-                    (1 - end_num_examples / start_num_examples) * 100,
+                    "Skipping %s dataset because %s already exists",
+                    split,
+                    features_cache_file,
                 )
+                continue
 
-            logger.info("Converting %s dataset to features", split)
+            logger.info("Removing empty examples from %s dataset", split)
+            start_num_examples = len(self.dataset[split])
+            self.dataset[split] = self.dataset[split].filter(
+                remove_empty,
+                cache_file_name=os.path.join(
+                    self.hparams.cache_file_path,
+                    (split + "_filtered_" + self.tokenized_data_key + ".arrow"),
+                ),
+            )
+            end_num_examples = len(self.dataset[split])
+            logger.info(
+                "Removed %i (%.2f%%) examples from the dataset.",
+                start_num_examples - end_num_examples,
+                (1 - end_num_examples / start_num_examples) * 100,
+            )
+
+            # `map()` writes the features directly to `features_cache_file` (one file
+            # per process when `num_proc` is greater than 1), which `setup()` loads
+            # with `load_tokenized_split()`.
+            logger.info(
+                "Converting %s dataset to features and saving to %s",
+                split,
+                features_cache_file,
+            )
             self.dataset[split] = self.dataset[split].map(
                 convert_to_features,
                 batched=True,
+                batch_size=1000,
+                num_proc=num_proc,
                 remove_columns=self.dataset[split].data.column_names,
                 cache_file_name=features_cache_file,
             )
@@ -564,12 +772,22 @@ class AbstractiveSummarizer(pl.LightningModule):
             sys.exit(0)
 
     def abs_collate_fn(self, batch, modifier=None):
-        pad_token_id = self.tokenizer.pad_token_id
+        pad_token_id = self.pad_token_id
 
-        source_ids = torch.stack([x["source"] for x in batch])
-        source_mask = torch.stack([x["source_mask"] for x in batch])
-        target_ids = torch.stack([x["target"] for x in batch])
-        target_mask = torch.stack([x["target_mask"] for x in batch])
+        # The examples are stored without padding so pad them to the length of the
+        # longest example in the batch.
+        source_ids = pad_sequence(
+            [x["source"] for x in batch], batch_first=True, padding_value=pad_token_id
+        )
+        source_mask = pad_sequence(
+            [x["source_mask"] for x in batch], batch_first=True, padding_value=0
+        )
+        target_ids = pad_sequence(
+            [x["target"] for x in batch], batch_first=True, padding_value=pad_token_id
+        )
+        target_mask = pad_sequence(
+            [x["target_mask"] for x in batch], batch_first=True, padding_value=0
+        )
 
         source_ids_trimmed, source_mask_trimmed = trim_batch(
             source_ids, pad_token_id, attention_mask=source_mask
@@ -589,32 +807,64 @@ class AbstractiveSummarizer(pl.LightningModule):
 
         return batch
 
+    def dataloader_worker_kwargs(self):
+        """
+        Keyword arguments for ``DataLoader`` that keep the worker processes alive between
+        epochs instead of starting new ones each epoch and have each worker load 4 batches
+        in advance. Only applies when ``--dataloader_num_workers`` is greater than 0 and
+        PyTorch is version 1.7.0 or newer.
+        """
+        if self.hparams.dataloader_num_workers > 0 and version.parse(
+            torch.__version__
+        ) >= version.parse("1.7.0"):
+            return {"persistent_workers": True, "prefetch_factor": 4}
+        return {}
+
     def train_dataloader(self):
         """Create dataloader for training."""
         train_dataset = self.dataset["train"]
 
-        sampler = None
-        shuffle = True
+        # `batch_sampler` is mutually exclusive with `batch_size`, `shuffle`, and `sampler`
+        sampler_kwargs = {"batch_size": self.hparams.batch_size, "shuffle": True}
         if self.hparams.sortish_sampler:
             # https://github.com/huggingface/transformers/blob/dc31a72f505bc115a2214a68c8ea7c956f98fd1b/examples/seq2seq/finetune.py#L206
             assert self.hparams.gpus <= 1
             sampler = SortishSampler(
                 train_dataset,
                 self.hparams.batch_size,
-                pad_token_id=self.tokenizer.pad_token_id,
+                pad_token_id=self.pad_token_id,
             )
-            shuffle = False
+            sampler_kwargs = {"batch_size": self.hparams.batch_size, "sampler": sampler}
+        elif self.hparams.bucket_sampler:
+            # Lightning cannot add a `DistributedSampler` to a dataloader that uses a
+            # `batch_sampler`, so check the actual number of processes (`--gpus -1`
+            # uses every GPU).
+            assert (
+                self.trainer.world_size == 1
+            ), "`--bucket_sampler` is only supported when training on a single GPU."
+            batch_sampler = BucketBatchSampler(
+                self.train_source_lengths, self.hparams.batch_size
+            )
+            sampler_kwargs = {"batch_sampler": batch_sampler}
 
         train_dataloader = DataLoader(
             train_dataset,
-            batch_size=self.hparams.batch_size,
             num_workers=self.hparams.dataloader_num_workers,
             pin_memory=True,
             collate_fn=self.collate_fn,
-            shuffle=shuffle,
-            sampler=sampler,
+            **sampler_kwargs,
+            **self.dataloader_worker_kwargs(),
         )
 
+        if self.hparams.prefetch_to_gpu and self.device.type == "cuda":
+            # `DataPreFetcher` is not a `DataLoader`, so a `DistributedSampler` cannot
+            # be added to it. `--gpus -1` uses every GPU, so check the actual number of
+            # processes instead of the option.
+            assert (
+                self.trainer.world_size == 1
+            ), "`--prefetch_to_gpu` is only supported when training on a single GPU."
+            train_dataloader = DataPreFetcher(train_dataloader)
+
         return train_dataloader
 
     def val_dataloader(self):
@@ -631,6 +881,7 @@ class AbstractiveSummarizer(pl.LightningModule):
             num_workers=self.hparams.dataloader_num_workers,
             pin_memory=True,
             collate_fn=self.collate_fn,
+            **self.dataloader_worker_kwargs(),
         )
 
         return val_dataloader
@@ -638,9 +889,17 @@ class AbstractiveSummarizer(pl.LightningModule):
     def test_dataloader(self):
         """Create dataloader for testing."""
         self.rouge_metrics = ["rouge1", "rouge2", "rougeL"]
-        self.rouge_scorer = rouge_scorer.RougeScorer(
-            self.rouge_metrics, use_stemmer=True
-        )
+        if not self.hparams.test_use_pyrouge:
+            # Each process in the pool creates its own scorer once when it starts. The
+            # processes are started with "spawn" instead of "fork" because CUDA and the
+            # dataloader and tokenizer threads are already running when they start.
+            self.rouge_futures = []
+            self.rouge_pool = ProcessPoolExecutor(
+                max_workers=min(os.cpu_count() or 1, 8),
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_rouge_worker,
+                initargs=(self.rouge_metrics,),
+            )
 
         self.hparams.test_batch_size = (
             self.hparams.test_batch_size
@@ -656,6 +915,7 @@ class AbstractiveSummarizer(pl.LightningModule):
             num_workers=self.hparams.dataloader_num_workers,
             pin_memory=True,
             collate_fn=self.collate_fn,
+            **self.dataloader_worker_kwargs(),
         )
 
         return test_dataloader
@@ -665,11 +925,8 @@ class AbstractiveSummarizer(pl.LightningModule):
         Configure the optimizers. Returns the optimizer and scheduler specified by
         the values in ``self.hparams``.
         """
-        # create the train dataloader so the number of examples can be determined
-        self.train_dataloader_object = self.train_dataloader()
-
         return generic_configure_optimizers(
-            self.hparams, self.train_dataloader_object, self.named_parameters()
+            self.hparams, self.num_train_batches, self.named_parameters()
         )
 
     def calculate_loss(self, prediction_scores, labels):
@@ -690,10 +947,9 @@ class AbstractiveSummarizer(pl.LightningModule):
             batch["target_mask"],
         )
 
-        labels = target.clone()
-        # labels[labels == 1] = -100  # -100 index = padding token
-
-        outputs = self.forward(source, target, source_mask, target_mask, labels=labels)
+        # The loss function ignores `pad_token_id` so the padding in `target` does not
+        # need to be replaced with -100 and `target` can be used as the labels directly.
+        outputs = self.forward(source, target, source_mask, target_mask, labels=target)
         loss = outputs[0]
 
         return loss
@@ -702,48 +958,27 @@ class AbstractiveSummarizer(pl.LightningModule):
         """Training step: `PyTorch Lightning Documentation <https://pytorch-lightning.readthedocs.io/en/latest/api/pytorch_lightning.core.html#pytorch_lightning.core.LightningModule.training_step>`__"""
         cross_entropy_loss = self._step(batch)
 
-        tqdm_dict = {"train_loss": cross_entropy_loss}
-        output = OrderedDict(
-            {"loss": cross_entropy_loss, "progress_bar": tqdm_dict, "log": tqdm_dict,}
-        )
-        return output
-
-    def validation_step(self, batch, batch_idx):  # skipcq: PYL-W0613
-        """Validation step: `PyTorch Lightning Documentation <https://pytorch-lightning.readthedocs.io/en/latest/api/pytorch_lightning.core.html#pytorch_lightning.core.LightningModule.validation_step>`__"""
-        cross_entropy_loss = self._step(batch)
+        self.log("train_loss", cross_entropy_loss, prog_bar=True)
 
-        tqdm_dict = {"val_loss": cross_entropy_loss}
-        output = OrderedDict(
-            {
-                "val_loss": cross_entropy_loss,
-                "progress_bar": tqdm_dict,
-                "log": tqdm_dict,
-            }
-        )
-        return output
+        return cross_entropy_loss
 
-    @staticmethod
-    def validation_epoch_end(outputs):
+    def validation_step(self, batch, batch_idx):  # skipcq: PYL-W0613
         """
-        Called at the end of a validation epoch: `PyTorch Lightning Documentation <https://pytorch-lightning.readthedocs.io/en/latest/api/pytorch_lightning.core.html#pytorch_lightning.core.LightningModule.validation_epoch_end>`__
-        Finds the mean of all the metrics logged by :meth:`~abstractive.AbstractiveSummarizer.validation_step`.
+        Validation step: `PyTorch Lightning Documentation <https://pytorch-lightning.readthedocs.io/en/latest/api/pytorch_lightning.core.html#pytorch_lightning.core.LightningModule.validation_step>`__
+        The loss is averaged over the validation epoch by ``self.log``.
         """
-        avg_loss = torch.stack([x["val_loss"] for x in outputs]).mean()
+        cross_entropy_loss = self._step(batch)
 
-        tqdm_dict = {"val_loss": avg_loss}
-        output = {
-            "val_loss": avg_loss,
-            "progress_bar": tqdm_dict,
-            "log": tqdm_dict,
-        }
-        return output
+        self.log(
+            "val_loss", cross_entropy_loss, on_epoch=True, prog_bar=True, sync_dist=True
+        )
 
     def test_step(self, batch, batch_idx):  # skipcq: PYL-W0613
         """
         Test step: `PyTorch Lightning Documentation <https://pytorch-lightning.readthedocs.io/en/latest/api/pytorch_lightning.core.html#pytorch_lightning.core.LightningModule.test_step>`__
         Similar to :meth:`~abstractive.AbstractiveSummarizer.validation_step` in that in runs the inputs
-        through the model. However, this method also calculates the ROUGE scores for each example-summary
-        pair.
+        through the model. However, this method also starts calculating the ROUGE scores for each
+        example-summary pair, which are collected in :meth:`~abstractive.AbstractiveSummarizer.test_epoch_end`.
         """
         source_ids, target_ids, source_mask, _ = (
             batch["source"],
@@ -753,9 +988,9 @@ class AbstractiveSummarizer(pl.LightningModule):
         )
 
         source_ids, source_mask = trim_batch(
-            source_ids, self.tokenizer.pad_token_id, attention_mask=source_mask
+            source_ids, self.pad_token_id, attention_mask=source_mask
         )
-        target_ids = trim_batch(target_ids, self.tokenizer.pad_token_id)
+        target_ids = trim_batch(target_ids, self.pad_token_id)
 
         # Generate
         # Set `pad_token_id` to `self.target_eoseq_token_id`, which is the same as
@@ -776,18 +1011,16 @@ class AbstractiveSummarizer(pl.LightningModule):
                 else int(self.tokenizer.max_len / 2)
             ),
             no_repeat_ngram_size=3,
+            early_stopping=True,
             use_cache=True,
+            **self.generation_kwargs(),
         )
         generation_time = time() - t0
         logger.debug("Generation Time: %.2f", generation_time)
 
-        generated_ids = generated_ids.tolist()
-        target_ids = target_ids.tolist()
-
         predictions = self.ids_to_clean_text(generated_ids, replace_sep_with_q=True)
         targets = self.ids_to_clean_text(target_ids, replace_sep_with_q=True)
 
-        rouge_outputs = []
         if self.hparams.test_use_pyrouge:
             with open("save_gold.txt", "a+") as save_gold, open(
                 "save_pred.txt", "a+"
@@ -797,10 +1030,12 @@ class AbstractiveSummarizer(pl.LightningModule):
                 for i, _ in enumerate(predictions):
                     save_pred.write(predictions[i].strip() + "\n")
         else:
-            for target, prediction in zip(targets, predictions):
-                target.replace("<q>", "\n")
-                prediction.replace("<q>", "\n")
-                rouge_outputs.append(self.rouge_scorer.score(target, prediction))
+            # Score the examples in another process since ROUGE is computed in pure
+            # python. The scores are collected in `test_epoch_end()` so generation
+            # does not wait for them.
+            self.rouge_futures.append(
+                self.rouge_pool.submit(_score_rouge, targets, predictions)
+            )
 
         # Save about `self.hparams.save_percentage` of the predictions and targets
         # if `self.hparams.save_percentage` is set.
@@ -817,7 +1052,6 @@ class AbstractiveSummarizer(pl.LightningModule):
 
         output = OrderedDict(
             {
-                "rouge_scores": rouge_outputs,
                 "generation_time": generation_time,
                 "prediction": output_prediction,
                 "target": output_target,
@@ -830,7 +1064,7 @@ class AbstractiveSummarizer(pl.LightningModule):
         Called at the end of a testing epoch: `PyTorch Lightning Documentation <https://pytorch-lightning.readthedocs.io/en/latest/api/pytorch_lightning.core.html#pytorch_lightning.core.LightningModule.test_epoch_end>`__
         Finds the mean of all the metrics logged by :meth:`~abstractive.AbstractiveSummarizer.test_step`.
         """
-        avg_generation_time = np.array([x["generation_time"] for x in outputs]).mean()
+        avg_generation_time = sum(x["generation_time"] for x in outputs) / len(outputs)
 
         rouge_scores_log = {}
 
@@ -840,9 +1074,10 @@ class AbstractiveSummarizer(pl.LightningModule):
             aggregator = scoring.BootstrapAggregator()
             rouge_scores_list = [
                 rouge_score_set
-                for batch_list in outputs
-                for rouge_score_set in batch_list["rouge_scores"]
+                for future in self.rouge_futures
+                for rouge_score_set in future.result()
             ]
+            self.shutdown_rouge_pool()
             for score in rouge_scores_list:
                 aggregator.add_scores(score)
             # The aggregator returns a dictionary with keys coresponding to the rouge metric
@@ -873,20 +1108,44 @@ class AbstractiveSummarizer(pl.LightningModule):
                 save_dir, "test_predictions.txt"
             )
             output_test_targets_file = os.path.join(save_dir, "test_targets.txt")
+            # Each prediction and target is a single string so write one per line
             with open(output_test_predictions_file, "w+") as p_writer, open(
                 output_test_targets_file, "w+"
             ) as t_writer:
-                for prediction, target in zip(predictions, targets):
-                    p_writer.writelines(s + "\n" for s in prediction)
-                    t_writer.writelines(s + "\n" for s in target)
-                p_writer.close()
-                t_writer.close()
+                p_writer.write("\n".join(predictions) + "\n")
+                t_writer.write("\n".join(targets) + "\n")
 
         # Generate logs
-        tqdm_dict = {"generation_time": avg_generation_time}
-        log = {**rouge_scores_log, **tqdm_dict}
-        result = {"progress_bar": tqdm_dict, "log": log}
-        return result
+        self.log("generation_time", avg_generation_time, prog_bar=True)
+        for name, value in rouge_scores_log.items():
+            self.log(name, value, prog_bar=False)
+
+    def shutdown_rouge_pool(self):
+        """Stop the processes that calculate the ROUGE scores during testing."""
+        if self.rouge_pool is not None:
+            for future in self.rouge_futures:
+                future.cancel()
+            self.rouge_futures = []
+            self.rouge_pool.shutdown()
+            self.rouge_pool = None
+
+    def teardown(self, stage):  # skipcq: PYL-W0613
+        """
+        Called at the end of fit and test: `PyTorch Lightning Documentation <https://pytorch-lightning.readthedocs.io/en/latest/lightning_module.html#teardown>`__
+        Makes sure the ROUGE scoring processes are stopped if testing ended before
+        :meth:`~abstractive.AbstractiveSummarizer.test_epoch_end` was called.
+        """
+        self.shutdown_rouge_pool()
+
+    def generation_kwargs(self):
+        """
+        Keyword arguments for ``generate()`` that depend on the options. The
+        ``length_penalty`` is only passed when ``--gen_length_penalty`` is set so models
+        saved before the option was added keep generating with the default of the model.
+        """
+        if self.hparams.gen_length_penalty is not None:
+            return {"length_penalty": self.hparams.gen_length_penalty}
+        return {}
 
     def predict(self, input_sequence):
         """Summaries ``input_sequence`` using the model. Can summarize a list of
@@ -910,28 +1169,40 @@ class AbstractiveSummarizer(pl.LightningModule):
             return_attention_mask=False,
             return_token_type_ids=False,
         )["input_ids"]
-        input_sequence_encoded = torch.tensor(input_sequence_encoded)
+        input_sequence_encoded = torch.tensor(
+            input_sequence_encoded, device=self.device
+        )
 
-        t0 = time()
-        generated_ids = self.model.generate(
-            input_ids=input_sequence_encoded,
-            num_beams=3,
-            decoder_start_token_id=self.target_boseq_token_id,
-            bos_token_id=self.target_boseq_token_id,
-            eos_token_id=self.target_eoseq_token_id,
-            pad_token_id=self.target_eoseq_token_id,
-            max_length=(
-                self.hparams.gen_max_len
-                if self.hparams.gen_max_len
-                else int(self.tokenizer.max_len / 2)
-            ),
-            no_repeat_ngram_size=3,
-            use_cache=True,
+        # `pytorch_lightning` only enables autocast inside the training and evaluation
+        # loops, so enable it here if the model was trained with native 16-bit precision.
+        use_autocast = (
+            self.hparams.precision == 16
+            and getattr(self.hparams, "amp_backend", "native") == "native"
+            and self.device.type == "cuda"
         )
+
+        t0 = time()
+        with torch.cuda.amp.autocast(enabled=use_autocast):
+            generated_ids = self.model.generate(
+                input_ids=input_sequence_encoded,
+                num_beams=3,
+                decoder_start_token_id=self.target_boseq_token_id,
+                bos_token_id=self.target_boseq_token_id,
+                eos_token_id=self.target_eoseq_token_id,
+                pad_token_id=self.target_eoseq_token_id,
+                max_length=(
+                    self.hparams.gen_max_len
+                    if self.hparams.gen_max_len
+                    else int(self.tokenizer.max_len / 2)
+                ),
+                no_repeat_ngram_size=3,
+                early_stopping=True,
+                use_cache=True,
+                **self.generation_kwargs(),
+            )
         generation_time = time() - t0
         logger.debug("Generation Time: %.2f", generation_time)
 
-        generated_ids = generated_ids.tolist()
         prediction = self.ids_to_clean_text(generated_ids)
 
         return prediction
@@ -941,8 +1212,9 @@ class AbstractiveSummarizer(pl.LightningModule):
         ``tokenizer.batch_decode`` and also clean up spacing and special tokens.
 
         Args:
-            generated_ids (list): A list examples where each example is a list of
-                IDs generated from ``tokenizer.encode``.
+            generated_ids (torch.Tensor or list): A tensor of shape ``(batch_size, sequence_length)``
+                or a list of examples where each example is a list of IDs generated from
+                ``tokenizer.encode``.
             replace_sep_with_q (bool, optional): Replace the ``self.tokenizer.sep_token``
                 with "<q>". Useful for determineing sentence boundaries and calculating
                 ROUGE scores. Defaults to False.
@@ -952,11 +1224,20 @@ class AbstractiveSummarizer(pl.LightningModule):
             string if only one example was passed to this function.
         """
 
-        if replace_sep_with_q:
+        if torch.is_tensor(generated_ids):
+            if replace_sep_with_q:
+                generated_ids = generated_ids.masked_fill(
+                    generated_ids == self.sep_token_id,
+                    self.rouge_sentence_split_token_id,
+                )
+            # Copy the IDs to the CPU and convert them to lists in one call since the
+            # tokenizer cannot decode tensors.
+            generated_ids = generated_ids.cpu().tolist()
+        elif replace_sep_with_q:
             generated_ids = (
                 [
                     self.rouge_sentence_split_token_id
-                    if token == self.tokenizer.sep_token_id
+                    if token == self.sep_token_id
                     else token
                     for token in example_ids
                 ]
@@ -1024,6 +1305,12 @@ class AbstractiveSummarizer(pl.LightningModule):
             type=int,
             help="The number of workers to use when loading data. A general place to start is to set num_workers equal to the number of CPUs on your machine. More details here: https://pytorch-lightning.readthedocs.io/en/latest/performance.html#num-workers",
         )
+        parser.add_argument(
+            "--preprocessing_num_workers",
+            default=None,
+            type=int,
+            help="The number of processes to use when tokenizing the dataset. 0 or 1 tokenizes in the main process. Defaults to the number of CPUs on your machine (up to 8).",
+        )
         parser.add_argument(
             "--only_preprocess",
             action="store_true",
@@ -1112,7 +1399,16 @@ class AbstractiveSummarizer(pl.LightningModule):
             "--gen_max_len",
             type=int,
             default=None,
-            help="Maximum sequence length during generation while testing and when using the `predict()` function.",
+            help="""Maximum sequence length during generation while testing and when using the 
+            `predict()` function. Generation time is roughly proportional to this value, so set it 
+            close to the length of the longest target summary (about 128 tokens for CNN/DM). 
+            Defaults to half of the maximum length of the tokenizer.""",
+        )
+        parser.add_argument(
+            "--gen_length_penalty",
+            type=float,
+            default=2.0,
+            help="Exponential penalty to the length used by beam search during generation. Values greater than 1.0 favor longer summaries. Beam search stops once `num_beams` finished candidates are found.",
         )
         parser.add_argument(
             "--label_smoothing",
@@ -1127,6 +1423,39 @@ class AbstractiveSummarizer(pl.LightningModule):
             to avoid memory errors caused by large batches by forcing large batches to be 
             processed first.""",
         )
+        parser.add_argument(
+            "--bucket_sampler",
+            action="store_true",
+            help="""Group examples with similar source lengths into the same batch so each 
+            batch is padded to a length close to the length of its examples. The examples are 
+            shuffled, split into buckets of 50 batches, and sorted by length within each bucket, 
+            and then the order of the batches is shuffled. Cannot be used with `--sortish_sampler`. 
+            Only supported when training on a single GPU.""",
+        )
+        parser.add_argument(
+            "--prefetch_to_gpu",
+            action="store_true",
+            help="""Copy the next training batch to the GPU on a separate CUDA stream while the 
+            current batch is processed. Only supported when training on a single GPU.""",
+        )
+        parser.add_argument(
+            "--attn_implementation",
+            type=str,
+            default=None,
+            choices=["eager", "sdpa", "flash_attention_2"],
+            help="""The attention implementation to use in the model. `sdpa` uses PyTorch's fused 
+            `scaled_dot_product_attention`, which does not store the full attention matrix. 
+            Requires huggingface/transformers version 4.36.0 or newer and a model that supports 
+            the chosen implementation (`sdpa` is supported by fewer models in older versions 
+            and `flash_attention_2` also requires the `flash_attn` package). If it is not 
+            supported, the default attention implementation of the model is used and a warning 
+            is logged. Not used by the LongformerEncoderDecoder.""",
+        )
+        parser.add_argument(
+            "--compile_model",
+            action="store_true",
+            help="Compile the forward pass of the model with `torch.compile` (requires PyTorch 2.0 or newer) to fuse kernels and reduce python overhead during training.",
+        )
         parser.add_argument(
             "--nlp_cache_dir",
             type=str,
@@ -10,7 +10,7 @@ from functools import partial
 from collections import OrderedDict
 from argparse import ArgumentParser, Namespace
 import pytorch_lightning as pl
-from rouge_score import rouge_scorer, scoring
+from rouge_score import scoring
 import torch
 from torch import nn
 from torch.utils.data import DataLoader
@@ -27,6 +27,7 @@ from helpers import (
     block_trigrams,
     test_rouge,
     generic_configure_optimizers,
+    CachingRougeScorer,
 )
 
 logger = logging.getLogger(__name__)
@@ -660,7 +661,7 @@ class ExtractiveSummarizer(pl.LightningModule):
     def test_dataloader(self):
         """Create dataloader for testing."""
         self.rouge_metrics = ["rouge1", "rouge2", "rougeL", "rougeLsum"]
-        self.rouge_scorer = rouge_scorer.RougeScorer(
+        self.rouge_scorer = CachingRougeScorer(
             self.rouge_metrics, use_stemmer=True
         )
         test_dataset = self.datasets[self.hparams.test_name]
@@ -680,9 +681,12 @@ class ExtractiveSummarizer(pl.LightningModule):
         """
         # create the train dataloader so the number of examples can be determined
         self.train_dataloader_object = self.train_dataloader()
+        num_train_batches = (
+            len(self.train_dataloader_object.dataset) // self.hparams.batch_size
+        )
 
         return generic_configure_optimizers(
-            self.hparams, self.train_dataloader_object, self.named_parameters()
+            self.hparams, num_train_batches, self.named_parameters()
         )
 
     def training_step(self, batch, batch_idx):  # skipcq: PYL-W0613
@@ -9,10 +9,12 @@ import pytorch_lightning as pl
 import torch
 import torch_optimizer
 import numpy as np
+from packaging import version
 from torch import nn
 import torch.nn.functional as F
 from functools import partial
 from torch.utils.data import Sampler
+from rouge_score import rouge_scorer
 
 logger = logging.getLogger(__name__)
 
@@ -270,6 +272,38 @@ class LabelSmoothingLoss(nn.Module):
         return F.kl_div(output, model_prob, reduction="batchmean")
 
 
+class _CachedStemmer:
+    """Wrap a stemmer and remember the stem of every word that has been stemmed."""
+
+    def __init__(self, stemmer):
+        self.stemmer = stemmer
+        self.cache = {}
+
+    def stem(self, word):
+        stem = self.cache.get(word)
+        if stem is None:
+            stem = self.stemmer.stem(word)
+            self.cache[word] = stem
+        return stem
+
+
+class CachingRougeScorer(rouge_scorer.RougeScorer):
+    """
+    ``RougeScorer`` that caches the stem of each word across calls to ``score()``.
+    The Porter stemmer is the slowest part of tokenization and the vocabulary of the
+    summaries is small, so most words are stemmed once and then looked up.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(CachingRougeScorer, self).__init__(*args, **kwargs)
+        # Older versions of `rouge-score` store the stemmer on the scorer while newer
+        # versions store it on the tokenizer.
+        for obj in (self, getattr(self, "_tokenizer", None)):
+            stemmer = getattr(obj, "_stemmer", None)
+            if stemmer is not None:
+                obj._stemmer = _CachedStemmer(stemmer)  # skipcq: PYL-W0212
+
+
 # https://github.com/huggingface/transformers/blob/dc31a72f505bc115a2214a68c8ea7c956f98fd1b/examples/seq2seq/utils.py#L158
 class SortishSampler(Sampler):
     """
@@ -312,6 +346,85 @@ class SortishSampler(Sampler):
         return iter(sort_idx)
 
 
+class BucketBatchSampler(Sampler):
+    """
+    Yield batches of indices where each batch contains examples of similar length so
+    that little padding is needed. The indices are shuffled and split into buckets of
+    ``bucket_size`` examples. Each bucket is sorted by length and split into batches,
+    and then the order of all the batches is shuffled.
+    """
+
+    def __init__(self, lengths, batch_size, bucket_size=None):
+        self.lengths = np.asarray(lengths)
+        self.batch_size = batch_size
+        self.bucket_size = bucket_size if bucket_size else batch_size * 50
+
+    def __len__(self):
+        num_full_buckets, remainder = divmod(len(self.lengths), self.bucket_size)
+        return num_full_buckets * math.ceil(
+            self.bucket_size / self.batch_size
+        ) + math.ceil(remainder / self.batch_size)
+
+    def __iter__(self):
+        idxs = np.random.permutation(len(self.lengths))
+        batches = []
+        for i in range(0, len(idxs), self.bucket_size):
+            bucket = idxs[i : i + self.bucket_size]
+            bucket = bucket[np.argsort(self.lengths[bucket], kind="stable")]
+            batches.extend(
+                bucket[j : j + self.batch_size].tolist()
+                for j in range(0, len(bucket), self.batch_size)
+            )
+        for batch_idx in np.random.permutation(len(batches)):
+            yield batches[batch_idx]
+
+
+class DataPreFetcher:
+    """
+    Wrap a ``DataLoader`` and copy the next batch to the GPU on a separate CUDA stream
+    while the current batch is being processed so the transfer is not on the critical path.
+    From NVIDIA/apex with modifications for batches that are dictionaries: https://github.com/NVIDIA/apex/blob/a651e2c24ecf97cbf367fd3f330df36760e1c597/examples/imagenet/main_amp.py#L256
+    """
+
+    def __init__(self, loader):
+        self.loader = loader
+        self.dataset = loader.dataset
+
+    def __len__(self):
+        return len(self.loader)
+
+    def __iter__(self):
+        stream = torch.cuda.Stream()
+        loader_iter = iter(self.loader)
+        next_batch = self.preload(loader_iter, stream)
+        while next_batch is not None:
+            # wait for the copies of `next_batch` to finish before it is used
+            torch.cuda.current_stream().wait_stream(stream)
+            batch = next_batch
+            # the memory of `batch` was allocated on `stream` so tell the caching
+            # allocator that it is used on the current stream
+            for value in batch.values():
+                if torch.is_tensor(value):
+                    value.record_stream(torch.cuda.current_stream())
+            next_batch = self.preload(loader_iter, stream)
+            yield batch
+
+    @staticmethod
+    def preload(loader_iter, stream):
+        try:
+            batch = next(loader_iter)
+        except StopIteration:
+            return None
+
+        with torch.cuda.stream(stream):
+            return {
+                key: (
+                    value.cuda(non_blocking=True) if torch.is_tensor(value) else value
+                )
+                for key, value in batch.items()
+            }
+
+
 def get_optimizer(hparams, optimizer_grouped_parameters):
     if hparams.optimizer_type == "ranger":
         optimizer = torch_optimizer.Ranger(
@@ -345,21 +458,41 @@ def get_optimizer(hparams, optimizer_grouped_parameters):
             eps=hparams.adam_epsilon,
             amsbound=False,
         )
+    elif hparams.optimizer_type == "adamw8bit":
+        import bitsandbytes as bnb
+
+        optimizer = bnb.optim.AdamW8bit(
+            optimizer_grouped_parameters,
+            lr=hparams.learning_rate,
+            eps=hparams.adam_epsilon,
+        )
     else:
+        # The fused implementation updates all the parameters in a few kernels instead
+        # of launching several kernels per parameter, but it requires PyTorch 2.0 and
+        # all the parameters to be on the GPU.
+        kwargs = {}
+        if version.parse(torch.__version__) >= version.parse("2.0.0"):
+            kwargs["fused"] = all(
+                p.is_cuda
+                for group in optimizer_grouped_parameters
+                for p in group["params"]
+            )
         optimizer = torch.optim.AdamW(
             optimizer_grouped_parameters,
             lr=hparams.learning_rate,
             eps=hparams.adam_epsilon,
+            **kwargs,
         )
 
     return optimizer
 
 
-def generic_configure_optimizers(hparams, train_dataloader, params_to_update):
+def generic_configure_optimizers(hparams, num_train_batches, params_to_update):
     """
     Configure the optimizers. Returns the optimizer and scheduler specified by
     the values in ``hparams``. This is a generic function that both the extractive
-    and abstractive scripts use.
+    and abstractive scripts use. ``num_train_batches`` is the number of full batches
+    in one epoch of the training data and is used to compute the total number of steps.
     """
     # check that max_steps is not None and is greater than 0
     if hparams.max_steps and hparams.max_steps > 0:
@@ -371,30 +504,27 @@ def generic_configure_optimizers(hparams, train_dataloader, params_to_update):
         t_total = hparams.max_steps * hparams.accumulate_grad_batches
     else:
         t_total = int(
-            (
-                len(train_dataloader.dataset)
-                // (hparams.batch_size * max(1, hparams.gpus))
-            )
+            (num_train_batches // max(1, hparams.gpus))
             * hparams.max_epochs
             // hparams.accumulate_grad_batches
         )
         if hparams.overfit_batches > 0.0:
             t_total = int(t_total * hparams.overfit_batches)
 
+    # Split the parameters in a single pass since `params_to_update` may be a generator
+    # (such as the one returned by `named_parameters()`), which can only be iterated once.
     no_decay = ["bias", "LayerNorm.weight"]
+    decay_params = []
+    no_decay_params = []
+    for n, p in params_to_update:
+        if any(nd in n for nd in no_decay):
+            no_decay_params.append(p)
+        else:
+            decay_params.append(p)
+
     optimizer_grouped_parameters = [
-        {
-            "params": [
-                p for n, p in params_to_update if not any(nd in n for nd in no_decay)
-            ],
-            "weight_decay": hparams.weight_decay,
-        },
-        {
-            "params": [
-                p for n, p in params_to_update if any(nd in n for nd in no_decay)
-            ],
-            "weight_decay": 0.0,
-        },
+        {"params": decay_params, "weight_decay": hparams.weight_decay},
+        {"params": no_decay_params, "weight_decay": 0.0},
     ]
 
     optimizer = get_optimizer(hparams, optimizer_grouped_parameters)
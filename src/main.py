@@ -213,13 +213,20 @@ if __name__ == "__main__":
         "--amp_level",
         type=str,
         default="O1",
-        help="The optimization level to use (O1, O2, etc…) for 16-bit GPU precision (using NVIDIA apex under the hood).",
+        help="The optimization level to use (O1, O2, etc…) for 16-bit GPU precision when `--amp_backend` is `apex` (using NVIDIA apex under the hood).",
+    )
+    parser.add_argument(
+        "--amp_backend",
+        type=str,
+        default="native",
+        choices=["native", "apex"],
+        help="The mixed precision backend to use when `--precision` is 16. `native` uses PyTorch's automatic mixed precision (`torch.cuda.amp`) and does not require NVIDIA apex. Default is 'native'.",
     )
     parser.add_argument(
         "--precision",
         type=int,
         default=32,
-        help="Full precision (32), half precision (16). Can be used on CPU, GPU or TPUs.",
+        help="Full precision (32), half precision (16). Can be used on CPU, GPU or TPUs. Half precision runs the matrix multiplications on tensor cores (when available) while keeping the weights and optimizer state in 32-bit.",
     )
     parser.add_argument(
         "--seed",
@@ -267,7 +274,7 @@ if __name__ == "__main__":
     parser.add_argument(
         "--gradient_checkpointing",
         action="store_true",
-        help="Enable gradient checkpointing (save memory at the expense of a slower backward pass) for the word embedding model. More info: https://github.com/huggingface/transformers/pull/4659#issue-424841871",
+        help="Enable gradient checkpointing (save memory at the expense of a slower backward pass) for the word embedding model (extractive) or the encoder and decoder (abstractive). The saved memory can be used for larger batches. More info: https://github.com/huggingface/transformers/pull/4659#issue-424841871",
     )
     parser.add_argument(
         "--do_train", action="store_true", help="Run the training procedure."
@@ -340,7 +347,9 @@ if __name__ == "__main__":
         "--optimizer_type",
         type=str,
         default="adam",
-        help="""Which optimizer to use: `adamw` (default), `ranger`, `qhadam`, `radam`, or `adabound`.""",
+        help="""Which optimizer to use: `adamw` (default), `ranger`, `qhadam`, `radam`, `adabound`, 
+        or `adamw8bit`. `adamw` uses the fused implementation when possible. `adamw8bit` stores 
+        the optimizer state in 8-bit and requires the `bitsandbytes` package.""",
     )
     parser.add_argument(
         "--ranger-k",